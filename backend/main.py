@@ -1,23 +1,56 @@
 ##Fixed
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import shutil
+import aiofiles
 from rag_engine import RAGEngine
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+if not GROQ_API_KEY:
+    raise ValueError("GROQ_API_KEY not found in environment variables")
+
+# Point CHROMA_PERSIST_DIR at a RAM disk (e.g. /dev/shm/chroma_db) when the
+# knowledge base can be rebuilt from the source documents
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
+
+# Created once per process on startup, shared by all requests
+rag_engine: Optional[RAGEngine] = None
+# Ingestion (PDF extraction + embedding) runs here, off the event loop
+ingest_executor: Optional[ThreadPoolExecutor] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the RAG engine and warm up the embedding model before serving"""
+    global rag_engine, ingest_executor
+    rag_engine = RAGEngine(groq_api_key=GROQ_API_KEY, persist_directory=CHROMA_PERSIST_DIR)
+    rag_engine.embedding_model.encode(["warmup"], convert_to_numpy=True)
+    ingest_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    yield
+    ingest_executor.shutdown(wait=True)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Knowledge Base RAG API",
     description="API for document ingestion and question answering using RAG",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -29,12 +62,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG engine
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY not found in environment variables")
-
-rag_engine = RAGEngine(groq_api_key=GROQ_API_KEY)
+# Status of background ingestion jobs, keyed by job id
+JOBS: Dict[str, Dict] = {}
+# Finish time of completed jobs, oldest first; finished jobs are forgotten
+# after JOB_TTL seconds or once more than MAX_FINISHED_JOBS have piled up
+FINISHED_JOBS: "OrderedDict[str, float]" = OrderedDict()
+JOB_TTL = 3600
+MAX_FINISHED_JOBS = 1000
 
 # Create upload directory
 UPLOAD_DIR = Path("./data/documents")
@@ -51,6 +85,7 @@ class QueryResponse(BaseModel):
     sources: Optional[List[str]] = None
     context_used: Optional[int] = None
     message: Optional[str] = None
+    cache: Optional[str] = None
 
 # API Routes
 
@@ -61,44 +96,90 @@ async def root():
         "message": "Knowledge Base RAG API",
         "version": "1.0.0",
         "endpoints": {
-            "POST /upload": "Upload documents",
+            "POST /upload?filename=<name>": "Upload a document as the raw request body",
+            "GET /jobs/{job_id}": "Get the status of a document ingestion job",
             "POST /query": "Query the knowledge base",
+            "POST /query/stream": "Query the knowledge base, streaming the answer as server-sent events",
             "GET /stats": "Get knowledge base statistics",
             "DELETE /clear": "Clear knowledge base"
         }
     }
 
-@app.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
+def _prune_jobs():
+    """Drop finished jobs that are past their TTL or over the cap"""
+    now = time.monotonic()
+    while FINISHED_JOBS:
+        job_id, finished_at = next(iter(FINISHED_JOBS.items()))
+        if now - finished_at < JOB_TTL and len(FINISHED_JOBS) <= MAX_FINISHED_JOBS:
+            break
+        FINISHED_JOBS.popitem(last=False)
+        JOBS.pop(job_id, None)
+
+async def _run_ingest(job_id: str, file_path: Path, filename: str):
+    """Ingest an uploaded document and record the outcome in JOBS"""
+    JOBS[job_id] = {"status": "processing", "document_name": filename}
+    try:
+        # Ingest document without blocking other requests
+        result = await asyncio.get_running_loop().run_in_executor(
+            ingest_executor, rag_engine.ingest_document, str(file_path), filename
+        )
+    except Exception as e:
+        result = {"status": "error", "message": f"Ingestion failed: {str(e)}"}
+    JOBS[job_id] = result
+    FINISHED_JOBS[job_id] = time.monotonic()
+    _prune_jobs()
+
+@app.post("/upload", status_code=202)
+async def upload_document(request: Request, filename: str, background_tasks: BackgroundTasks):
     """
-    Upload and ingest a document (PDF or TXT)
+    Upload a document (PDF or TXT) and queue it for ingestion
+    
+    The file bytes are the raw request body and are streamed straight to
+    disk, so memory use does not grow with the file size. Ingestion runs
+    in the background; poll GET /jobs/{job_id} for the result.
     """
     try:
         # Validate file type
-        if not file.filename.endswith(('.pdf', '.txt')):
+        filename = Path(filename).name
+        if not filename.endswith(('.pdf', '.txt')):
             raise HTTPException(
                 status_code=400, 
                 detail="Only PDF and TXT files are supported"
             )
         
-        # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Stream uploaded file to disk under a job-scoped name, so concurrent
+        # uploads of the same file never overwrite each other
+        job_id = uuid4().hex
+        file_path = UPLOAD_DIR / f"{job_id}_{filename}"
+        async with aiofiles.open(file_path, "wb") as out:
+            async for chunk in request.stream():
+                await out.write(chunk)
         
-        # Ingest document
-        result = rag_engine.ingest_document(str(file_path), file.filename)
+        _prune_jobs()
+        JOBS[job_id] = {"status": "pending", "document_name": filename}
+        background_tasks.add_task(_run_ingest, job_id, file_path, filename)
         
-        if result["status"] == "error":
-            raise HTTPException(status_code=500, detail=result["message"])
-        
-        return result
+        return {
+            "status": "accepted",
+            "job_id": job_id,
+            "document_name": filename
+        }
         
     except HTTPException as he:
         raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the status of a document ingestion job
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/query", response_model=QueryResponse)
 async def query_knowledge_base(request: QueryRequest):
     """
@@ -108,13 +189,37 @@ async def query_knowledge_base(request: QueryRequest):
         if not request.question.strip():
             raise HTTPException(status_code=400, detail="Question cannot be empty")
         
-        result = rag_engine.query(request.question, request.top_k)
+        # Run in the threadpool so concurrent queries can share embedding batches
+        result = await run_in_threadpool(rag_engine.query, request.question, request.top_k)
         
         return QueryResponse(**result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
+@app.post("/query/stream")
+async def query_knowledge_base_stream(request: QueryRequest):
+    """
+    Query the knowledge base and stream the answer as server-sent events
+    
+    Each event is a JSON object: one "metadata" event with the sources,
+    then "token" events with answer text, or an "error" event.
+    """
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    
+    def event_stream():
+        # Headers are already sent once streaming starts, so failures are
+        # reported as an error event instead of an HTTP 500
+        try:
+            for event in rag_engine.query_stream(request.question, request.top_k):
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            event = {"type": "error", "message": f"Query failed: {str(e)}"}
+            yield f"data: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/stats")
 async def get_stats():
     """
@@ -155,5 +260,8 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # One worker keeps a single copy of the embedding model in memory;
+    # concurrency comes from the event loop and the thread pools. uvloop and
+    # httptools are picked automatically when installed (uvicorn[standard])
+    uvicorn.run(app, host="0.0.0.0", port=8000, workers=1)
 
@@ -1,40 +1,222 @@
 import os
-from typing import List, Dict
+import re
+import time
+import queue
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from typing import List, Dict, Iterator, Optional, Tuple
+import numpy as np
 import pandas as pd
+import torch
 import chromadb
+import diskcache
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 from groq import Groq
-import PyPDF2
+import pypdfium2 as pdfium
 from pathlib import Path
 
+# PDFium is not thread-safe: every pypdfium2 call (opening, page/textpage
+# access, closing) must hold this lock, or concurrent ingests can crash
+# the process
+PDFIUM_LOCK = threading.Lock()
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Pre-exported int8 ONNX graph in the model repo, used for CPU inference;
+# set EMBEDDING_ONNX_FILE="" to fall back to the PyTorch model
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+
+# Chunks per encode/add round trip during ingestion
+INGEST_BATCH_SIZE = 256
+# Mini-batch size used by the transformer inside each encode call
+ENCODE_BATCH_SIZE = 64
+# Concurrent query embeddings are coalesced into batches of up to this
+# size, waiting at most QUERY_BATCH_WAIT_MS for more queries to arrive
+QUERY_BATCH_SIZE = 32
+QUERY_BATCH_WAIT_MS = 5
+
+LLM_MODEL = "llama-3.3-70b-versatile"  # or "mixtral-8x7b-32768"
+LLM_TEMPERATURE = 0.3
+LLM_MAX_TOKENS = 1024
+# Seconds a Groq response stays in the on-disk cache
+LLM_CACHE_TTL = 86400
+
+# Answer caches: exact question match (LRU) and recent question embeddings
+ANSWER_CACHE_SIZE = 1024
+SEMANTIC_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.97
+
+# Return the top chunk verbatim, skipping the LLM, when it is this close to
+# the question (cosine distance) and short enough to stand as an answer
+RETRIEVAL_ONLY_MAX_DISTANCE = float(os.getenv("RETRIEVAL_ONLY_MAX_DISTANCE", "0.10"))
+RETRIEVAL_ONLY_MAX_CHARS = int(os.getenv("RETRIEVAL_ONLY_MAX_CHARS", "400"))
+
+# Instructions shared by every request; kept first and byte-identical so
+# the provider's prompt prefix cache can reuse them
+_CACHEABLE_PREFIX = """You are a knowledgeable assistant that answers questions based on the provided context.
+Use the context given by the user to answer their question. If the answer cannot be found in the context, say so.
+Answer the question succinctly and cite the sources used."""
+
+# HNSW index settings for the knowledge base collection. Stored and query
+# embeddings are L2-normalized, so inner product ranks exactly like cosine
+# without the per-distance norms; batch/sync thresholds are raised so bulk
+# inserts amortize index writes. The HNSW index is only flushed to disk every
+# sync_threshold records; anything newer is replayed from Chroma's SQLite
+# log on restart
+COLLECTION_METADATA = {
+    "hnsw:space": "ip",
+    "hnsw:construction_ef": 200,
+    "hnsw:M": 32,
+    "hnsw:search_ef": 64,
+    "hnsw:batch_size": 1000,
+    "hnsw:sync_threshold": 100000
+}
+
+# PDF headers/footers: the first or last line of a page is dropped when the
+# same line (digits ignored, e.g. page numbers) is in that position on more
+# than this fraction of pages; documents shorter than the minimum are kept
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_PAGE_FRACTION = 0.5
+# Later copies of blank-line separated paragraphs at least this long are
+# dropped; the first copy is always kept
+DUPLICATE_PARAGRAPH_MIN_CHARS = 200
+
+# Lookup table of the code points str.split() treats as whitespace
+# (all of them are <= U+3000)
+WHITESPACE_TABLE = np.array([chr(c).isspace() for c in range(0x3001)])
+
+def select_device() -> str:
+    """Pick the fastest available torch device for the embedding model"""
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+def load_embedding_model(device: str) -> SentenceTransformer:
+    """Load the embedding model: int8 ONNX Runtime on CPU, FP16 torch on CUDA"""
+    if device == "cpu":
+        torch.set_num_threads(os.cpu_count() or 1)
+        if EMBEDDING_ONNX_FILE:
+            return SentenceTransformer(
+                EMBEDDING_MODEL,
+                backend="onnx",
+                model_kwargs={"file_name": EMBEDDING_ONNX_FILE}
+            )
+    
+    model = SentenceTransformer(EMBEDDING_MODEL, device=device)
+    if device == "cuda":
+        model.half()
+    return model
+
+class QueryEmbeddingBatcher:
+    """Micro-batches concurrent query embeddings into single encode calls"""
+    
+    def __init__(self, model: SentenceTransformer, max_batch: int = QUERY_BATCH_SIZE,
+                 max_wait_ms: float = QUERY_BATCH_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+        self._worker.start()
+    
+    def embed(self, query: str) -> np.ndarray:
+        """Embed one query, blocking until its batch has been encoded"""
+        future: Future = Future()
+        self._queue.put((query, future))
+        return future.result()
+    
+    def _drain(self) -> List[Tuple[str, Future]]:
+        """Wait for one query, then collect more until the batch is full or the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._drain()
+            try:
+                embeddings = self.model.encode(
+                    [query for query, _ in batch],
+                    batch_size=len(batch),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
 class RAGEngine:
-    def __init__(self, groq_api_key: str, persist_directory: str = "./chroma_db"):
+    def __init__(self, groq_api_key: str, persist_directory: str = "./chroma_db",
+                 llm_cache_directory: str = "./llm_cache"):
         """Initialize RAG engine with ChromaDB and Groq"""
         self.groq_client = Groq(api_key=groq_api_key)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        
+        # SQLite-backed cache of Groq responses, survives restarts
+        self.llm_cache = diskcache.Cache(llm_cache_directory)
+        
+        # Load the embedding model once on the best device
+        self.device = select_device()
+        self.embedding_model = load_embedding_model(self.device)
+        self.query_batcher = QueryEmbeddingBatcher(self.embedding_model)
         
         # Initialize ChromaDB with persistence
-        self.chroma_client = chromadb.Client(Settings(
-            persist_directory=persist_directory,
-            anonymized_telemetry=False
-        ))
+        self.chroma_client = chromadb.PersistentClient(
+            path=persist_directory,
+            settings=Settings(anonymized_telemetry=False)
+        )
         
         # Get or create collection
         self.collection = self.chroma_client.get_or_create_collection(
             name="knowledge_base",
-            metadata={"hnsw:space": "cosine"}
+            metadata=COLLECTION_METADATA
         )
         
+        # Answer caches, invalidated whenever the knowledge base changes
+        self._cache_lock = threading.Lock()
+        self._answer_cache: "OrderedDict[Tuple[str, int, str], Dict]" = OrderedDict()
+        self._qembed_cache: List[Tuple[int, Dict]] = []
+        self._qembed_matrix: Optional[np.ndarray] = None
+        
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extract text from PDF file"""
+        return "\n".join(self.extract_pages_from_pdf(pdf_path))
+    
+    def extract_pages_from_pdf(self, pdf_path: str) -> List[str]:
+        """Extract the text of each page of a PDF file"""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            # pdfium calls must be serialized; see PDFIUM_LOCK
+            with PDFIUM_LOCK:
+                pdf = pdfium.PdfDocument(pdf_path)
+                try:
+                    pages = []
+                    for page in pdf:
+                        try:
+                            textpage = page.get_textpage()
+                            try:
+                                pages.append(textpage.get_text_range())
+                            finally:
+                                textpage.close()
+                        finally:
+                            page.close()
+                    return pages
+                finally:
+                    pdf.close()
         except Exception as e:
             raise Exception(f"Error extracting PDF: {str(e)}")
     
@@ -47,17 +229,71 @@ class RAGEngine:
             raise Exception(f"Error reading text file: {str(e)}")
 
     
+    def remove_page_boilerplate(self, pages: List[str]) -> Tuple[List[str], int]:
+        """Drop header/footer lines repeated at the top or bottom of most pages"""
+        if len(pages) < BOILERPLATE_MIN_PAGES:
+            return pages, 0
+        
+        def key(line: str) -> str:
+            return re.sub(r'\d+', '#', " ".join(line.split()))
+        
+        page_lines = [page.splitlines() for page in pages]
+        # Index of the first and last non-empty line of each page
+        page_edges = []
+        for lines in page_lines:
+            filled = [i for i, line in enumerate(lines) if line.strip()]
+            page_edges.append((filled[0], filled[-1]) if filled else None)
+        
+        headers = Counter(key(lines[e[0]]) for lines, e in zip(page_lines, page_edges) if e)
+        footers = Counter(key(lines[e[1]]) for lines, e in zip(page_lines, page_edges) if e)
+        threshold = len(pages) * BOILERPLATE_PAGE_FRACTION
+        
+        cleaned = []
+        removed = 0
+        for lines, edges in zip(page_lines, page_edges):
+            drop = set()
+            if edges:
+                first, last = edges
+                if headers[key(lines[first])] > threshold:
+                    drop.add(first)
+                if footers[key(lines[last])] > threshold:
+                    drop.add(last)
+            removed += len(drop)
+            cleaned.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+        
+        return cleaned, removed
+    
+    def remove_duplicate_paragraphs(self, text: str) -> Tuple[str, int]:
+        """Drop later copies of long paragraphs that already appeared verbatim"""
+        paragraphs = re.split(r'\n\s*\n', text)
+        seen = set()
+        kept = []
+        for paragraph in paragraphs:
+            key = " ".join(paragraph.split())
+            if len(key) >= DUPLICATE_PARAGRAPH_MIN_CHARS and key in seen:
+                continue
+            seen.add(key)
+            kept.append(paragraph)
+        
+        return "\n\n".join(kept), len(paragraphs) - len(kept)
+    
     def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
         """Split text into overlapping chunks"""
-        words = text.split()
-        chunks = []
+        # Find word boundaries in one vectorized pass over the code points,
+        # then take each chunk as a single slice of the original text
+        codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        is_space = (codes <= 0x3000) & WHITESPACE_TABLE[np.minimum(codes, 0x3000)]
+        in_word = np.concatenate(([False], ~is_space, [False]))
+        edges = np.flatnonzero(in_word[1:] != in_word[:-1])
+        starts, ends = edges[0::2], edges[1::2]
         
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            if chunk:
-                chunks.append(chunk)
+        first_words = np.arange(0, len(starts), chunk_size - overlap)
+        last_words = np.minimum(first_words + chunk_size, len(ends)) - 1
         
-        return chunks
+        return [
+            text[start:end]
+            for start, end in zip(starts[first_words].tolist(), ends[last_words].tolist())
+        ]
     
     def ingest_document(self, file_path: str, document_name: str = None) -> Dict:
         """Process and store document in ChromaDB"""
@@ -66,35 +302,56 @@ class RAGEngine:
             if document_name is None:
                 document_name = file_path.name
             
-            # Extract text based on file type
+            # Extract text based on file type; PDFs also lose per-page headers/footers
             if file_path.suffix.lower() == '.pdf':
-                text = self.extract_text_from_pdf(str(file_path))
+                pages, boilerplate_removed = self.remove_page_boilerplate(
+                    self.extract_pages_from_pdf(str(file_path))
+                )
+                text = "\n".join(pages)
             elif file_path.suffix.lower() == '.txt':
                 text = self.extract_text_from_txt(str(file_path))
+                boilerplate_removed = 0
             else:
                 raise ValueError(f"Unsupported file type: {file_path.suffix}")
             
-            # Chunk the text
-            chunks = self.chunk_text(text)
+            # Drop repeated long paragraphs, then chunk and drop any chunk
+            # that is still an exact repeat
+            text, paragraphs_removed = self.remove_duplicate_paragraphs(text)
+            all_chunks = self.chunk_text(text)
+            chunks = list(dict.fromkeys(all_chunks))
             
-            # Generate embeddings
-            embeddings = self.embedding_model.encode(chunks).tolist()
+            # Group chunks of similar length so each batch pads to a similar size;
+            # chunk IDs are each chunk's position in the deduplicated list
+            order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
             
-            # Create unique IDs for chunks
-            chunk_ids = [f"{document_name}_chunk_{i}" for i in range(len(chunks))]
+            # Embed and store in fixed-size batches to cap peak memory
+            for start in range(0, len(order), INGEST_BATCH_SIZE):
+                batch_ids = order[start:start + INGEST_BATCH_SIZE]
+                batch = [chunks[i] for i in batch_ids]
+                embeddings = self.embedding_model.encode(
+                    batch,
+                    batch_size=ENCODE_BATCH_SIZE,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                ).astype(np.float32, copy=False)
+                
+                self.collection.add(
+                    embeddings=embeddings,
+                    documents=batch,
+                    ids=[f"{document_name}_chunk_{i}" for i in batch_ids],
+                    metadatas=[{"source": document_name, "chunk_id": i} for i in batch_ids]
+                )
             
-            # Store in ChromaDB
-            self.collection.add(
-                embeddings=embeddings,
-                documents=chunks,
-                ids=chunk_ids,
-                metadatas=[{"source": document_name, "chunk_id": i} for i in range(len(chunks))]
-            )
+            self.clear_answer_cache()
             
             return {
                 "status": "success",
                 "document_name": document_name,
                 "chunks_created": len(chunks),
+                "boilerplate_lines_removed": boilerplate_removed,
+                "duplicate_paragraphs_removed": paragraphs_removed,
+                "duplicates_skipped": len(all_chunks) - len(chunks),
                 "message": f"Successfully ingested {document_name}"
             }
             
@@ -104,12 +361,18 @@ class RAGEngine:
                 "message": str(e)
             }
     
-    def retrieve_context(self, query: str, top_k: int = 5) -> List[Dict]:
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a single query as an L2-normalized vector"""
+        return self.query_batcher.embed(query)
+    
+    def retrieve_context(self, query: str, top_k: int = 5,
+                         query_embedding: Optional[np.ndarray] = None) -> List[Dict]:
         """Retrieve relevant chunks from ChromaDB"""
-        query_embedding = self.embedding_model.encode([query]).tolist()
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
         
         results = self.collection.query(
-            query_embeddings=query_embedding,
+            query_embeddings=[query_embedding.astype(np.float32, copy=False)],
             n_results=top_k
         )
         
@@ -119,46 +382,56 @@ class RAGEngine:
                 context_chunks.append({
                     "text": doc,
                     "source": results['metadatas'][0][i]['source'],
+                    "chunk_id": results['metadatas'][0][i].get('chunk_id'),
                     "distance": results['distances'][0][i] if 'distances' in results else None
                 })
         
         return context_chunks
     
+    def _build_messages(self, query: str, context_chunks: List[Dict]) -> List[Dict]:
+        """Build chat messages with the invariant instructions as the prefix"""
+        # Stable chunk order so repeated retrievals produce identical prompts
+        ordered = sorted(context_chunks, key=lambda c: (c['source'], c.get('chunk_id') or 0))
+        context = "\n\n".join([f"[Source: {chunk['source']}]\n{chunk['text']}" for chunk in ordered])
+        
+        return [
+            {
+                "role": "system",
+                "content": _CACHEABLE_PREFIX
+            },
+            {
+                "role": "user",
+                "content": f"Context:\n{context}\n\nQuestion: {query}"
+            }
+        ]
+    
+    def _llm_cache_key(self, messages: List[Dict]) -> str:
+        """Hash the model settings and prompt into an LLM cache key"""
+        return hashlib.blake2b(
+            (LLM_MODEL + str(LLM_TEMPERATURE) + "".join(m["content"] for m in messages)).encode(),
+            digest_size=16
+        ).hexdigest()
+    
     def generate_answer(self, query: str, context_chunks: List[Dict]) -> Dict:
         """Generate answer using Groq LLM"""
-        # Build context from retrieved chunks
-        context = "\n\n".join([f"[Source: {chunk['source']}]\n{chunk['text']}" for chunk in context_chunks])
-        
-        # Create prompt
-        prompt = f"""You are a helpful assistant that answers questions based on the provided context. 
-Use the context below to answer the user's question. If the answer cannot be found in the context, say so.
-
-Context:
-{context}
-
-Question: {query}
-
-Answer the question succinctly and cite the sources used."""
+        messages = self._build_messages(query, context_chunks)
         
         try:
-            # Call Groq API
-            chat_completion = self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a knowledgeable assistant that provides accurate answers based on given context."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.3-70b-versatile",  # or "mixtral-8x7b-32768"
-                temperature=0.3,
-                max_tokens=1024
-            )
+            # Identical prompts get identical answers; skip the API call on a hit
+            cache_key = self._llm_cache_key(messages)
+            answer = self.llm_cache.get(cache_key)
             
-            answer = chat_completion.choices[0].message.content
+            if answer is None:
+                # Call Groq API
+                chat_completion = self.groq_client.chat.completions.create(
+                    messages=messages,
+                    model=LLM_MODEL,
+                    temperature=LLM_TEMPERATURE,
+                    max_tokens=LLM_MAX_TOKENS
+                )
+                
+                answer = chat_completion.choices[0].message.content
+                self.llm_cache.set(cache_key, answer, expire=LLM_CACHE_TTL)
             
             return {
                 "status": "success",
@@ -173,6 +446,33 @@ Answer the question succinctly and cite the sources used."""
                 "message": f"Error generating answer: {str(e)}"
             }
     
+    def generate_answer_stream(self, query: str, context_chunks: List[Dict]) -> Iterator[str]:
+        """Stream answer tokens from Groq LLM as they are generated"""
+        messages = self._build_messages(query, context_chunks)
+        cache_key = self._llm_cache_key(messages)
+        
+        answer = self.llm_cache.get(cache_key)
+        if answer is not None:
+            yield answer
+            return
+        
+        stream = self.groq_client.chat.completions.create(
+            messages=messages,
+            model=LLM_MODEL,
+            temperature=LLM_TEMPERATURE,
+            max_tokens=LLM_MAX_TOKENS,
+            stream=True
+        )
+        
+        tokens = []
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                tokens.append(delta)
+                yield delta
+        
+        self.llm_cache.set(cache_key, "".join(tokens), expire=LLM_CACHE_TTL)
+    
     def query(self, question: str, top_k: int = 5) -> Dict:
         """Main query method - retrieve and generate answer"""
         # Check if collection has documents
@@ -182,8 +482,12 @@ Answer the question succinctly and cite the sources used."""
                 "message": "No documents in knowledge base. Please upload documents first."
             }
         
+        cache_key, query_embedding, cached = self._lookup_answer(question, top_k)
+        if cached is not None:
+            return cached
+        
         # Retrieve relevant context
-        context_chunks = self.retrieve_context(question, top_k)
+        context_chunks = self.retrieve_context(question, top_k, query_embedding=query_embedding)
         
         if not context_chunks:
             return {
@@ -191,12 +495,161 @@ Answer the question succinctly and cite the sources used."""
                 "message": "No relevant information found in the knowledge base."
             }
         
+        result = self._retrieval_only_answer(context_chunks)
+        if result is not None:
+            return result
+        
         # Generate answer
         result = self.generate_answer(question, context_chunks)
         result['retrieved_chunks'] = context_chunks
         
+        if result["status"] == "success":
+            self._store_answer(cache_key, query_embedding, top_k, result)
+        
         return result
     
+    def query_stream(self, question: str, top_k: int = 5) -> Iterator[Dict]:
+        """Streaming query method - yields a metadata event, then answer tokens"""
+        if self.collection.count() == 0:
+            yield {
+                "type": "error",
+                "message": "No documents in knowledge base. Please upload documents first."
+            }
+            return
+        
+        cache_key, query_embedding, cached = self._lookup_answer(question, top_k)
+        if cached is not None:
+            yield {
+                "type": "metadata",
+                "sources": cached["sources"],
+                "context_used": cached["context_used"],
+                "cache": cached["cache"]
+            }
+            yield {"type": "token", "content": cached["answer"]}
+            return
+        
+        context_chunks = self.retrieve_context(question, top_k, query_embedding=query_embedding)
+        
+        if not context_chunks:
+            yield {
+                "type": "error",
+                "message": "No relevant information found in the knowledge base."
+            }
+            return
+        
+        result = self._retrieval_only_answer(context_chunks)
+        if result is not None:
+            yield {
+                "type": "metadata",
+                "sources": result["sources"],
+                "context_used": result["context_used"],
+                "cache": result["cache"]
+            }
+            yield {"type": "token", "content": result["answer"]}
+            return
+        
+        sources = list(set([chunk['source'] for chunk in context_chunks]))
+        yield {
+            "type": "metadata",
+            "sources": sources,
+            "context_used": len(context_chunks),
+            "cache": None
+        }
+        
+        tokens = []
+        try:
+            for token in self.generate_answer_stream(question, context_chunks):
+                tokens.append(token)
+                yield {"type": "token", "content": token}
+        except Exception as e:
+            yield {
+                "type": "error",
+                "message": f"Error generating answer: {str(e)}"
+            }
+            return
+        
+        self._store_answer(cache_key, query_embedding, top_k, {
+            "status": "success",
+            "answer": "".join(tokens),
+            "sources": sources,
+            "context_used": len(context_chunks),
+            "retrieved_chunks": context_chunks
+        })
+    
+    def _retrieval_only_answer(self, context_chunks: List[Dict]) -> Optional[Dict]:
+        """Answer with the top chunk itself if it is a near-exact, short match"""
+        top = context_chunks[0]
+        if top["distance"] is None or top["distance"] >= RETRIEVAL_ONLY_MAX_DISTANCE:
+            return None
+        if len(top["text"]) >= RETRIEVAL_ONLY_MAX_CHARS:
+            return None
+        
+        return {
+            "status": "success",
+            "answer": top["text"],
+            "sources": [top["source"]],
+            "context_used": 1,
+            "retrieved_chunks": context_chunks,
+            "cache": "retrieval_only"
+        }
+    
+    def _lookup_answer(self, question: str, top_k: int) -> Tuple[Tuple[str, int, str], Optional[np.ndarray], Optional[Dict]]:
+        """Check both answer caches; returns (cache key, query embedding, cached answer)"""
+        # Serve repeated questions from the exact-match cache
+        cache_key = (question.strip().lower(), top_k, LLM_MODEL)
+        cached = self._get_cached_answer(cache_key)
+        if cached is not None:
+            return cache_key, None, cached
+        
+        # Embed once; reused for the semantic cache and for retrieval
+        query_embedding = self.embed_query(question)
+        return cache_key, query_embedding, self._get_semantic_answer(query_embedding, top_k)
+    
+    def _get_cached_answer(self, cache_key: Tuple[str, int, str]) -> Optional[Dict]:
+        """Look up an answer for an exactly matching question"""
+        with self._cache_lock:
+            result = self._answer_cache.get(cache_key)
+            if result is None:
+                return None
+            self._answer_cache.move_to_end(cache_key)
+        return {**result, "cache": "exact"}
+    
+    def _get_semantic_answer(self, query_embedding: np.ndarray, top_k: int) -> Optional[Dict]:
+        """Look up an answer for a near-identical recent question"""
+        with self._cache_lock:
+            if self._qembed_matrix is None:
+                return None
+            similarities = self._qembed_matrix @ query_embedding
+            same_top_k = np.array([k == top_k for k, _ in self._qembed_cache])
+            similarities[~same_top_k] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+                return None
+            result = self._qembed_cache[best][1]
+        return {**result, "cache": "semantic"}
+    
+    def _store_answer(self, cache_key: Tuple[str, int, str], query_embedding: np.ndarray,
+                      top_k: int, result: Dict):
+        """Add a generated answer to both caches, evicting the oldest entries"""
+        with self._cache_lock:
+            self._answer_cache[cache_key] = result
+            if len(self._answer_cache) > ANSWER_CACHE_SIZE:
+                self._answer_cache.popitem(last=False)
+            
+            row = query_embedding[np.newaxis, :].astype(np.float32)
+            if self._qembed_matrix is None:
+                self._qembed_matrix = row
+            else:
+                self._qembed_matrix = np.vstack([self._qembed_matrix, row])[-SEMANTIC_CACHE_SIZE:]
+            self._qembed_cache = (self._qembed_cache + [(top_k, result)])[-SEMANTIC_CACHE_SIZE:]
+    
+    def clear_answer_cache(self):
+        """Drop all cached answers"""
+        with self._cache_lock:
+            self._answer_cache.clear()
+            self._qembed_cache = []
+            self._qembed_matrix = None
+    
     def get_stats(self) -> Dict:
         """Get knowledge base statistics"""
         try:
@@ -218,8 +671,9 @@ Answer the question succinctly and cite the sources used."""
             self.chroma_client.delete_collection("knowledge_base")
             self.collection = self.chroma_client.create_collection(
                 name="knowledge_base",
-                metadata={"hnsw:space": "cosine"}
+                metadata=COLLECTION_METADATA
             )
+            self.clear_answer_cache()
             return {"status": "success", "message": "Knowledge base cleared"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
\ No newline at end of file
@@ -1,4 +1,7 @@
 import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import requests
 import streamlit as st
@@ -12,6 +15,58 @@ st.set_page_config(
 
 # API configuration
 API_URL = os.getenv("API_URL", "http://localhost:8000")
+# Files uploaded to the API at the same time
+UPLOAD_WORKERS = 8
+# Seconds between ingestion job status checks, and before giving up
+JOB_POLL_INTERVAL = 1
+JOB_TIMEOUT = 600
+
+@st.cache_resource
+def get_session():
+    """Shared HTTP session so API calls reuse pooled keep-alive connections"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=5)
+def fetch_stats():
+    """Knowledge base stats, cached briefly so sidebar reruns skip the API"""
+    response = get_session().get(f"{API_URL}/stats", timeout=15)
+    response.raise_for_status()
+    return response.json()
+
+def post_one(session, uploaded_file):
+    """Upload one file as the raw request body and wait for its ingestion job"""
+    response = session.post(
+        f"{API_URL}/upload",
+        params={"filename": uploaded_file.name},
+        data=uploaded_file,
+        headers={"Content-Type": uploaded_file.type or "application/octet-stream"},
+        timeout=120,
+    )
+    if response.status_code != 202:
+        return {"status": "error", "message": f"Upload failed ({response.status_code})"}
+
+    job_id = response.json()["job_id"]
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while time.monotonic() < deadline:
+        job_response = session.get(f"{API_URL}/jobs/{job_id}", timeout=15)
+        # A missing job (e.g. after a server restart) will never finish
+        if job_response.status_code != 200:
+            return {"status": "error", "message": f"Job status check failed ({job_response.status_code})"}
+        job = job_response.json()
+        if job.get("status") in ("success", "error"):
+            return job
+        time.sleep(JOB_POLL_INTERVAL)
+    return {"status": "error", "message": "Timed out waiting for ingestion"}
+
+def sse_events(response):
+    """Yield the JSON events of a server-sent events response"""
+    for line in response.iter_lines(decode_unicode=True):
+        if line and line.startswith("data: "):
+            yield json.loads(line[len("data: "):])
 
 # Custom CSS
 st.markdown(
@@ -36,12 +91,10 @@ with st.sidebar:
 
     # Get stats
     try:
-        response = requests.get(f"{API_URL}/stats", timeout=15)
-        if response.status_code == 200:
-            stats = response.json()
-            st.metric("Total Chunks", stats.get("total_chunks", 0))
-        else:
-            st.warning("Could not fetch stats")
+        stats = fetch_stats()
+        st.metric("Total Chunks", stats.get("total_chunks", 0))
+    except requests.HTTPError:
+        st.warning("Could not fetch stats")
     except Exception:
         st.error("API connection failed")
 
@@ -51,8 +104,9 @@ with st.sidebar:
     st.header("🗑️ Management")
     if st.button("Clear Knowledge Base", type="secondary", key="clear_kb_btn"):
         try:
-            response = requests.delete(f"{API_URL}/clear", timeout=30)
+            response = get_session().delete(f"{API_URL}/clear", timeout=30)
             if response.status_code == 200:
+                fetch_stats.clear()
                 st.success("Knowledge base cleared!")
                 st.rerun()
             else:
@@ -92,22 +146,27 @@ with tab1:
         progress_bar = st.progress(0)
         status_text = st.empty()
 
-        for idx, uploaded_file in enumerate(uploaded_files):
-            status_text.text(f"Processing {uploaded_file.name}...")
-            try:
-                files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type or "application/octet-stream")}
-                response = requests.post(f"{API_URL}/upload", files=files, timeout=120)
+        status_text.text(f"Processing {len(uploaded_files)} file(s)...")
+        session = get_session()
 
-                if response.status_code == 200:
-                    result = response.json()
-                    st.success(f"✅ {uploaded_file.name}: {result.get('chunks_created', 0)} chunks created")
-                else:
-                    st.error(f"❌ {uploaded_file.name}: Upload failed ({response.status_code})")
-            except Exception as e:
-                st.error(f"❌ {uploaded_file.name}: {str(e)}")
+        # Upload in parallel; results are reported as each file finishes
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+            futures = {executor.submit(post_one, session, f): f for f in uploaded_files}
+            for idx, future in enumerate(as_completed(futures)):
+                uploaded_file = futures[future]
+                try:
+                    result = future.result()
+
+                    if result.get("status") == "success":
+                        st.success(f"✅ {uploaded_file.name}: {result.get('chunks_created', 0)} chunks created")
+                    else:
+                        st.error(f"❌ {uploaded_file.name}: {result.get('message', 'Ingestion failed')}")
+                except Exception as e:
+                    st.error(f"❌ {uploaded_file.name}: {str(e)}")
 
-            progress_bar.progress((idx + 1) / len(uploaded_files))
+                progress_bar.progress((idx + 1) / len(uploaded_files))
 
+        fetch_stats.clear()
         status_text.text("Processing complete!")
         st.toast("🎉 Files processed successfully!")
 
@@ -154,36 +213,50 @@ with tab2:
             st.warning("Please enter a question")
         else:
             top_k = int(st.session_state.get("top_k", 5))
-            with st.spinner("Searching knowledge base..."):
-                try:
-                    response = requests.post(
-                        f"{API_URL}/query",
+            try:
+                with st.spinner("Searching knowledge base..."):
+                    response = get_session().post(
+                        f"{API_URL}/query/stream",
                         json={"question": q, "top_k": top_k},
+                        stream=True,
                         timeout=60,
                     )
-                    if response.status_code == 200:
-                        result = response.json()
-                        if result.get("status") == "success":
-                            st.subheader("💡 Answer")
-                            st.markdown(result["answer"])
-
-                            st.subheader("📚 Sources")
-                            sources = result.get("sources", []) or []
-                            if sources:
-                                for source in sources:
-                                    st.markdown(f"- {source}")
-                            else:
-                                st.write("_No sources returned_")
-
-                            with st.expander("🔧 Query Details"):
-                                st.write(f"**Chunks Retrieved:** {result.get('context_used', 0)}")
-                                st.write(f"**Search Depth (Top-K):** {top_k}")
-                        else:
-                            st.error(result.get("message", "Query failed"))
+                    events = sse_events(response) if response.status_code == 200 else None
+                    # The first event carries sources, or an error
+                    first = next(events, None) if events else None
+
+                if response.status_code != 200:
+                    st.error(f"API request failed ({response.status_code})")
+                elif first is None or first["type"] == "error":
+                    st.error((first or {}).get("message", "Query failed"))
+                else:
+                    errors = []
+
+                    def answer_tokens():
+                        for event in events:
+                            if event["type"] == "token":
+                                yield event["content"]
+                            elif event["type"] == "error":
+                                errors.append(event["message"])
+
+                    st.subheader("💡 Answer")
+                    st.write_stream(answer_tokens())
+                    for message in errors:
+                        st.error(message)
+
+                    st.subheader("📚 Sources")
+                    sources = first.get("sources", []) or []
+                    if sources:
+                        for source in sources:
+                            st.markdown(f"- {source}")
                     else:
-                        st.error(f"API request failed ({response.status_code})")
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+                        st.write("_No sources returned_")
+
+                    with st.expander("🔧 Query Details"):
+                        st.write(f"**Chunks Retrieved:** {first.get('context_used', 0)}")
+                        st.write(f"**Search Depth (Top-K):** {top_k}")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
 
     # Example queries
     with st.expander("💡 Example Questions"):